@@ -0,0 +1,397 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import string
+import sys
+import time
+
+from rdt_layer import RDTLayer
+from segment import Segment
+from unreliable import UnreliableChannel
+
+# #################################################################################################################### #
+# Benchmarks                                                                                                           #
+#                                                                                                                      #
+# Description:                                                                                                         #
+# Times the processData hot paths in isolation at increasing payload sizes. Each case builds the state a layer or      #
+# channel would hold while carrying a payload of the given size, then times single calls to the hot path. The          #
+# log-log slope of per-iteration cost against size is checked against a complexity bound and, optionally, the costs   #
+# are compared against a stored baseline.                                                                              #
+#                                                                                                                      #
+# Usage:                                                                                                               #
+#   python rdt_bench.py                                   run every case at the default sizes                          #
+#   python rdt_bench.py --save-baseline base.json         store the measured costs                                     #
+#   python rdt_bench.py --baseline base.json              fail if a cost regressed versus the stored costs             #
+#   python rdt_bench.py --bound server=1.5                tighten (or loosen) the complexity bound of a case           #
+#                                                                                                                      #
+# #################################################################################################################### #
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]    # payload sizes in characters (1 KB to 10 MB)
+
+# Upper bound on the log-log slope of per-iteration cost versus payload size. A slope of 0 is constant time per
+# iteration, 1 is linear and 2 is quadratic. The defaults reflect the current implementation plus some headroom for
+# timer noise, they should be tightened as the hot paths are fixed.
+BOUNDS = {
+    'segment': 1.25,    # checksum is computed over the whole payload
+    'channel': 1.25,    # every queued segment is visited once
+    'client': 1.25,     # _retransmitSegment scans from the first sequence number up to the ack
+    'server': 2.25,     # transmittedPackets is re-sorted and de-duplicated through list scans
+}
+
+MIN_REPEATS = 3             # always time at least this many iterations per size
+MAX_REPEATS = 1000          # never time more than this many iterations per size
+MIN_TIME = 0.2              # in seconds, keep repeating until this much time has been measured
+BUDGET = 20.0               # in seconds, skip sizes whose predicted measurement time exceeds this
+TOLERANCE = 0.25            # allowed relative slowdown versus the baseline
+SEED = 7                    # seed for payloads and channel behaviour
+
+
+def makePayload(size, rng):
+    """
+    Random payload of the given size. The server treats an 'X' as a
+    checksum error, so only lowercase characters are used.
+    """
+    return ''.join(rng.choices(string.ascii_lowercase, k=size))
+
+
+def splitPayload(data):
+    """
+    Split data into (seqnum, payload) pairs the same way the client does:
+    three packets of DATA_LENGTH characters followed by one of DATA_LENGTH - 1.
+    """
+    chunks = []
+    seqnum = 1
+    packet = 0
+
+    while (seqnum - 1 < len(data)):
+        packet += 1
+        length = RDTLayer.DATA_LENGTH
+
+        if (packet == 4):
+            length -= 1
+            packet = 0
+
+        chunks.append((seqnum, data[seqnum - 1:seqnum - 1 + length]))
+        seqnum += length
+
+    return chunks
+
+
+def makeSegments(chunks):
+    segments = []
+
+    for seqnum, payload in chunks:
+        seg = Segment()
+        seg.setData(seqnum, payload)
+        segments.append(seg)
+
+    return segments
+
+
+def reliableChannel():
+    return UnreliableChannel(False, False, False, False)
+
+
+# #################################################################################################################### #
+# Cases                                                                                                                #
+#                                                                                                                      #
+# Each case takes the payload size and returns a (setup, run) pair. setup() is called before every timed iteration     #
+# and is not measured, run() is the measured call.                                                                     #
+# #################################################################################################################### #
+
+def segmentCase(size, rng):
+    """
+    Segment creation and checksum of a single segment carrying the whole payload
+    """
+    data = makePayload(size, rng)
+
+    def setup():
+        pass
+
+    def run():
+        seg = Segment()
+        seg.setData(1, data)
+        seg.checkChecksum()
+
+    return setup, run
+
+
+def channelCase(size, rng):
+    """
+    UnreliableChannel.processData with every segment of the payload queued
+    """
+    segments = makeSegments(splitPayload(makePayload(size, rng)))
+    state = {}
+
+    def setup():
+        random.seed(SEED)
+        channel = UnreliableChannel(True, True, True, True)
+        channel.sendQueue = list(segments)
+        state['channel'] = channel
+
+    def run():
+        state['channel'].processData()
+
+    return setup, run
+
+
+def clientCase(size, rng):
+    """
+    RDTLayer.processData in client mode with a timeout pending on the last
+    packet of the payload, so every iteration retransmits it.
+    """
+    data = makePayload(size, rng)
+    lastSeqnum = splitPayload(data)[-1][0]
+    state = {}
+
+    def setup():
+        client = RDTLayer()
+        client.setSendChannel(reliableChannel())
+        client.setReceiveChannel(reliableChannel())
+        client.setDataToSend(data)
+        client.currentAck = lastSeqnum
+        client.currentTimeouts = 1
+        state['client'] = client
+
+    def run():
+        state['client'].processData()
+
+    return setup, run
+
+
+def serverCase(size, rng):
+    """
+    RDTLayer.processData in server mode after all but the last window of the
+    payload has been received, with the next window arriving this iteration.
+    """
+    chunks = splitPayload(makePayload(size, rng))
+    window = max(1, RDTLayer.FLOW_CONTROL_WIN_SIZE // RDTLayer.DATA_LENGTH)
+    received = makeSegments(chunks[:-window])
+    incoming = makeSegments(chunks[-window:])
+    receivedSeqNums = [seg.seqnum for seg in received]
+    nextAck = incoming[0].seqnum
+    state = {}
+
+    def setup():
+        server = RDTLayer()
+        server.setSendChannel(reliableChannel())
+        server.setReceiveChannel(reliableChannel())
+        server.transmittedPackets = list(received)
+        server.transmittedSeqNums = list(receivedSeqNums)
+        server.currentAck = nextAck
+        server.cumulativeAck = nextAck
+        server.receiveChannel.receiveQueue = list(incoming)
+        state['server'] = server
+
+    def run():
+        state['server'].processData()
+
+    return setup, run
+
+
+CASES = {
+    'segment': segmentCase,
+    'channel': channelCase,
+    'client': clientCase,
+    'server': serverCase,
+}
+
+
+# #################################################################################################################### #
+# Measurement                                                                                                          #
+# #################################################################################################################### #
+
+def timeCase(setup, run):
+    """
+    Median wall-clock time of a single run() call, in seconds
+    """
+    samples = []
+    total = 0.0
+
+    while (len(samples) < MIN_REPEATS or (total < MIN_TIME and len(samples) < MAX_REPEATS)):
+        setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def fitSlope(results):
+    """
+    Least-squares slope of log(cost) against log(size)
+    """
+    points = [(math.log(r['size']), math.log(r['perIteration'])) for r in results]
+
+    if len(points) < 2:
+        return None
+
+    meanX = sum(x for x, _ in points) / len(points)
+    meanY = sum(y for _, y in points) / len(points)
+    num = sum((x - meanX) * (y - meanY) for x, y in points)
+    den = sum((x - meanX) ** 2 for x, _ in points)
+
+    # every point has the same size, there is no slope to fit
+    if den == 0:
+        return None
+
+    return num / den
+
+
+def predictCost(results, size):
+    """
+    Extrapolate the per-iteration cost at size from the sizes measured so far
+    """
+    if not results:
+        return 0.0
+
+    last = results[-1]
+    slope = fitSlope(results[-2:]) or 1.0
+    return last['perIteration'] * (size / last['size']) ** max(slope, 1.0)
+
+
+def runCase(name, sizes, budget):
+    results = []
+    skipped = []
+
+    for size in sizes:
+        if (predictCost(results, size) * MIN_REPEATS > budget):
+            skipped.append(size)
+            continue
+
+        setup, run = CASES[name](size, random.Random(SEED))
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            perIteration = timeCase(setup, run)
+
+        results.append({
+            'size': size,
+            'perIteration': perIteration,
+            'perByte': perIteration / size,
+        })
+
+    return results, skipped
+
+
+def checkBaseline(name, results, skipped, baseline, tolerance):
+    """
+    Compare per-iteration costs against the baseline, return failure messages
+    """
+    failures = []
+    stored = {r['size']: r['perIteration'] for r in baseline.get(name, {}).get('results', [])}
+
+    # a size the baseline measured but that no longer fits the budget has regressed too far to time
+    for size in skipped:
+        if size in stored:
+            failures.append("{0} @ {1}: skipped over budget, baseline measured {2:.3e}s per iteration"
+                            .format(name, size, stored[size]))
+
+    for r in results:
+        if r['size'] not in stored:
+            continue
+
+        limit = stored[r['size']] * (1 + tolerance)
+
+        if (r['perIteration'] > limit):
+            failures.append("{0} @ {1}: {2:.3e}s per iteration, baseline {3:.3e}s (+{4:.0%} allowed)"
+                            .format(name, r['size'], r['perIteration'], stored[r['size']], tolerance))
+
+    return failures
+
+
+def parseBounds(parser, values):
+    bounds = dict(BOUNDS)
+
+    for value in values:
+        name, _, bound = value.partition('=')
+
+        try:
+            if name not in CASES:
+                raise ValueError(name)
+            bounds[name] = float(bound)
+        except ValueError:
+            parser.error("invalid bound '{0}', expected <case>=<slope> with case in {1}"
+                         .format(value, ', '.join(CASES)))
+
+    return bounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the processData hot paths")
+    parser.add_argument('cases', nargs='*', metavar='CASE',
+                        help="cases to run, any of {0} (default: all)".format(', '.join(CASES)))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help="payload sizes in characters")
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help="seconds allowed per size before larger sizes are skipped")
+    parser.add_argument('--bound', action='append', default=[], metavar='CASE=SLOPE',
+                        help="override the complexity bound of a case")
+    parser.add_argument('--baseline', help="JSON file to compare the measured costs against")
+    parser.add_argument('--save-baseline', help="JSON file to store the measured costs in")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed relative slowdown versus the baseline")
+    args = parser.parse_args(argv)
+
+    names = args.cases or list(CASES)
+
+    for name in names:
+        if name not in CASES:
+            parser.error("unknown case '{0}'".format(name))
+
+    for size in args.sizes:
+        if size <= 0:
+            parser.error("invalid size {0}, sizes must be positive".format(size))
+
+    bounds = parseBounds(parser, args.bound)
+    sizes = sorted(set(args.sizes))
+    baseline = None
+    report = {}
+    failures = []
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for name in names:
+        results, skipped = runCase(name, sizes, args.budget)
+        slope = fitSlope(results)
+        report[name] = {'results': results, 'slope': slope}
+
+        print("{0}  (bound: slope <= {1})".format(name, bounds[name]))
+        print("    {0:>10}  {1:>14}  {2:>14}".format("size", "s/iteration", "s/byte"))
+
+        for r in results:
+            print("    {0:>10}  {1:>14.3e}  {2:>14.3e}".format(r['size'], r['perIteration'], r['perByte']))
+
+        for size in skipped:
+            print("    {0:>10}  {1:>14}".format(size, "skipped"))
+
+        if slope is None:
+            print("    slope: n/a")
+        else:
+            print("    slope: {0:.2f}".format(slope))
+
+            if (slope > bounds[name]):
+                failures.append("{0}: slope {1:.2f} exceeds bound {2}".format(name, slope, bounds[name]))
+
+        if baseline is not None:
+            failures.extend(checkBaseline(name, results, skipped, baseline, args.tolerance))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for failure in failures:
+        print("FAIL: {0}".format(failure))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
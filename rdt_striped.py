@@ -0,0 +1,216 @@
+import argparse
+import contextlib
+import os
+import random
+import string
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rdt_layer import RDTLayer
+from unreliable import UnreliableChannel
+
+# #################################################################################################################### #
+# Striped transfer                                                                                                     #
+#                                                                                                                      #
+# Description:                                                                                                         #
+# A single client/server RDTLayer pair sends one flow-control window per iteration on one CPU core. StripedTransfer    #
+# splits a large payload into contiguous stripes and sends each stripe through its own client/server pair and its own  #
+# pair of unreliable channels, with the pairs running in a process pool. The receiver reassembles the stripes in       #
+# order.                                                                                                               #
+#                                                                                                                      #
+# Usage:                                                                                                               #
+#   python rdt_striped.py                                 compare throughput for 1, 2, 4 and 8 stripes                 #
+#   python rdt_striped.py --stripes 1 4 16 --size 20000   choose the stripe counts and payload size                    #
+#   python rdt_striped.py --file speech.txt               send the contents of a file                                  #
+#                                                                                                                      #
+# #################################################################################################################### #
+
+
+def transferStripe(index, data, outOfOrder, dropPackets, delayPackets, dataErrors, maxIterations, seed):
+    """
+    Runs one client/server pair until the server has received data, in the
+    same sequence rdt_main uses. Called in a worker process.
+    """
+    # forked workers inherit the parent's random state, reseed so stripes see independent channel behaviour
+    random.seed(None if seed is None else seed + index)
+
+    client = RDTLayer()
+    server = RDTLayer()
+
+    clientToServerChannel = UnreliableChannel(outOfOrder, dropPackets, delayPackets, dataErrors)
+    serverToClientChannel = UnreliableChannel(outOfOrder, dropPackets, delayPackets, dataErrors)
+
+    client.setSendChannel(clientToServerChannel)
+    client.setReceiveChannel(serverToClientChannel)
+    server.setSendChannel(serverToClientChannel)
+    server.setReceiveChannel(clientToServerChannel)
+
+    client.setDataToSend(data)
+
+    loopIter = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while server.getDataReceived() != data:
+            if loopIter >= maxIterations:
+                raise RuntimeError("stripe {0} not received after {1} iterations".format(index, maxIterations))
+
+            loopIter += 1
+            client.processData()
+            clientToServerChannel.processData()
+            server.processData()
+            serverToClientChannel.processData()
+
+    return {
+        'index': index,
+        'data': server.getDataReceived(),
+        'iterations': loopIter,
+        'countSentPackets': clientToServerChannel.countSentPackets + serverToClientChannel.countSentPackets,
+        'countSegmentTimeouts': client.countSegmentTimeouts,
+    }
+
+
+class StripedTransfer(object):
+    """
+    Sends a payload as N stripes over N independent RDTLayer pairs,
+    each pair running in its own worker process.
+    """
+
+    MAX_ITERATIONS = 1_000_000      # per stripe, guards against a transfer that never completes
+
+    stripeCount: int                                    # number of stripes (and client/server pairs)
+    workers: int                                        # size of the process pool
+    outOfOrder: bool                                    # channel flags, as in rdt_main
+    dropPackets: bool
+    delayPackets: bool
+    dataErrors: bool
+    seed: object                                        # optional base seed for the channels, stripe i uses seed + i
+    stripeResults: list                                 # per-stripe results of the last transfer, in stripe order
+    elapsed: float                                      # wall-clock seconds taken by the last transfer
+
+    def __init__(self, stripeCount, outOfOrder=True, dropPackets=True, delayPackets=True, dataErrors=True,
+                 workers=None, seed=None):
+        if stripeCount < 1:
+            raise ValueError("stripeCount must be at least 1")
+
+        self.stripeCount = stripeCount
+        self.workers = workers or min(stripeCount, os.cpu_count() or 1)
+        self.outOfOrder = outOfOrder
+        self.dropPackets = dropPackets
+        self.delayPackets = delayPackets
+        self.dataErrors = dataErrors
+        self.seed = seed
+        self.stripeResults = []
+        self.elapsed = 0.0
+
+    def splitStripes(self, data):
+        """
+        Splits data into stripeCount contiguous stripes of near-equal length
+        """
+        size, extra = divmod(len(data), self.stripeCount)
+        stripes = []
+        start = 0
+
+        for i in range(self.stripeCount):
+            end = start + size + (1 if i < extra else 0)
+            stripes.append(data[start:end])
+            start = end
+
+        return stripes
+
+    def transfer(self, data):
+        """
+        Sends data and returns it as reassembled by the receiving side
+        """
+        # the server discards any segment containing an 'X' as corrupted, so such data never arrives
+        if 'X' in data:
+            raise ValueError("data must not contain 'X'")
+
+        stripes = self.splitStripes(data)
+        results = [None] * self.stripeCount
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+
+            for index, stripe in enumerate(stripes):
+                # an empty stripe would put its client in "server mode", there is nothing to send anyway
+                if stripe == '':
+                    results[index] = {'index': index, 'data': '', 'iterations': 0,
+                                      'countSentPackets': 0, 'countSegmentTimeouts': 0}
+                    continue
+
+                futures.append(pool.submit(transferStripe, index, stripe, self.outOfOrder, self.dropPackets,
+                                           self.delayPackets, self.dataErrors, self.MAX_ITERATIONS, self.seed))
+
+            for future in futures:
+                result = future.result()
+                results[result['index']] = result
+
+        self.elapsed = time.perf_counter() - start
+        self.stripeResults = results
+
+        # reassemble stripes in order
+        return ''.join(r['data'] for r in results)
+
+    @property
+    def throughput(self):
+        """
+        Characters per second achieved by the last transfer
+        """
+        if self.elapsed == 0:
+            return 0.0
+        return sum(len(r['data']) for r in self.stripeResults) / self.elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Striped multi-process transfer over RDTLayer pairs")
+    parser.add_argument('--stripes', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="stripe counts to compare")
+    parser.add_argument('--size', type=int, default=4000,
+                        help="size of the random payload in characters")
+    parser.add_argument('--file', help="send the contents of this file instead of a random payload")
+    parser.add_argument('--workers', type=int, help="process pool size (default: min(stripes, CPU count))")
+    parser.add_argument('--seed', type=int, help="seed for the payload and the channels")
+    parser.add_argument('--reliable', action='store_true', help="turn off all channel errors")
+    args = parser.parse_args(argv)
+
+    for stripeCount in args.stripes:
+        if stripeCount < 1:
+            parser.error("invalid stripe count {0}, must be at least 1".format(stripeCount))
+
+    if args.file:
+        with open(args.file) as f:
+            dataToSend = f.read()
+    else:
+        rng = random.Random(args.seed)
+        dataToSend = ''.join(rng.choices(string.ascii_lowercase, k=args.size))
+
+    if 'X' in dataToSend:
+        parser.error("data must not contain 'X', the server discards such segments as corrupted")
+
+    unreliable = not args.reliable
+    failed = False
+
+    print("{0:>8}  {1:>10}  {2:>12}  {3:>12}  {4:>10}".format(
+        "stripes", "seconds", "chars/s", "iterations", "timeouts"))
+
+    for stripeCount in args.stripes:
+        striped = StripedTransfer(stripeCount, unreliable, unreliable, unreliable, unreliable,
+                                  workers=args.workers, seed=args.seed)
+        dataReceived = striped.transfer(dataToSend)
+
+        # the slowest stripe decides how many iterations the transfer took
+        print("{0:>8}  {1:>10.3f}  {2:>12.1f}  {3:>12}  {4:>10}".format(
+            stripeCount, striped.elapsed, striped.throughput,
+            max(r['iterations'] for r in striped.stripeResults),
+            sum(r['countSegmentTimeouts'] for r in striped.stripeResults)))
+
+        if dataReceived != dataToSend:
+            print("stripes={0}: received data does not match sent data".format(stripeCount))
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())